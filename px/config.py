@@ -4,6 +4,8 @@ import configparser
 import getpass
 import multiprocessing
 import os
+import queue
+import re
 import socket
 import sys
 import threading
@@ -65,6 +67,18 @@ except ImportError:
 REALM = "Px"
 CLIENT_REALM = "PxClient"
 
+# Password for username cached by State.get_password()
+PASSWORD_TTL = 60
+
+# Host IP addresses cached by get_host_ips()
+HOST_IPS = None
+HOST_IPS_LOCK = threading.Lock()
+HOST_IPS_TIME = 0
+HOST_IPS_TTL = 60
+
+# file:///C:/path, file://C:/path, file:C:/path or file:///path
+FILE_URL_RE = re.compile(r"^file:(?://)?(?:/?([A-Za-z]:))?(.*)$")
+
 # Debug log locations
 LogLocation = int
 (
@@ -101,10 +115,10 @@ def get_script_cmd():
     # Case: "px.exe" from nuitka
     return spath
 
-def get_logfile(location):
-    "Get file path for debug output"
+def get_logfile(location, flags):
+    "Get file path for debug output - flags are CLI flags from State.parse_cli()"
     name = multiprocessing.current_process().name
-    if "--quit" in sys.argv:
+    if "quit" in flags:
         name = "quit"
     path = os.getcwd()
 
@@ -116,11 +130,9 @@ def get_logfile(location):
         pass
     elif location == LOG_UNIQLOG:
         # --log=3 - log to working directory with unique filename = --uniqlog
-        for arg in sys.argv:
+        if "port" in flags:
             # Add --port to filename
-            if arg.startswith("--port="):
-                name = arg[7:] + "-" + name
-                break
+            name = flags["port"] + "-" + name
         name = f"{name}-{time.time()}"
     elif location == LOG_STDOUT:
         # --verbose | --log=4 - log to stdout
@@ -137,27 +149,47 @@ def is_compiled():
     return getattr(sys, "frozen", False) or "__compiled__" in globals()
 
 def get_host_ips():
-    "Get IP addresses assigned to this host"
-    localips = netaddr.IPSet([])
-    addrs = psutil.net_if_addrs()
-    stats = psutil.net_if_stats()
-    for intf in addrs:
-        if stats[intf].isup:
-            for addr in addrs[intf]:
-                # IPv4 only for now
-                if addr.family in [socket.AF_INET]:#, socket.AF_INET6]:
-                    localips.add(addr.address.split("%")[0])
-
-    return localips
+    """
+    Get IP addresses assigned to this host
+
+    Returns a frozenset of IP strings - cached for HOST_IPS_TTL seconds since this
+    is checked for every client connection in --hostonly mode
+    """
+    global HOST_IPS, HOST_IPS_TIME
+    with HOST_IPS_LOCK:
+        if HOST_IPS is None or time.time() - HOST_IPS_TIME > HOST_IPS_TTL:
+            localips = set()
+            addrs = psutil.net_if_addrs()
+            stats = psutil.net_if_stats()
+            for intf in addrs:
+                if stats[intf].isup:
+                    for addr in addrs[intf]:
+                        # IPv4 only for now
+                        if addr.family in [socket.AF_INET]:#, socket.AF_INET6]:
+                            localips.add(addr.address.split("%")[0])
+
+            HOST_IPS = frozenset(localips)
+            HOST_IPS_TIME = time.time()
+
+        return HOST_IPS
 
 def file_url_to_local_path(file_url):
-    parts = urllib.parse.urlparse(file_url)
-    path = urllib.parse.unquote(parts.path)
-    if path.startswith('/') and not path.startswith('//'):
-        if len(parts.netloc) == 2 and parts.netloc[1] == ':':
-            return parts.netloc + path
-        return 'C:' + path
-    if len(path) > 2 and path[1] == ':':
+    """
+    Convert file:// URL into local path
+      Absolute paths without a drive letter are on C: on Windows
+      Returns None if not a local file URL
+    """
+    match = FILE_URL_RE.match(file_url)
+    if match is None:
+        return None
+
+    drive, path = match.groups()
+    path = urllib.parse.unquote(path)
+    if drive is not None:
+        return drive + path
+    if path.startswith("/") and not path.startswith("//"):
+        if sys.platform == "win32":
+            return "C:" + path
         return path
 
 def get_listen():
@@ -165,18 +197,18 @@ def get_listen():
     listen = STATE.listen[0]
     if len(listen) == 0:
         # Listening on all interfaces - figure out which one is allowed
-        hostips = get_host_ips()
+        hostips = sorted(get_host_ips(), key = netaddr.IPAddress)
         if STATE.gateway:
             # Check allow list
             for ip in hostips:
                 if ip in STATE.allow:
-                    listen = str(ip)
+                    listen = ip
                     break
             if len(listen) == 0:
                 return ""
         elif STATE.hostonly:
             # Use first host IP
-            listen = str(list(hostips)[0])
+            listen = hostips[0]
 
     return listen
 
@@ -186,7 +218,7 @@ def get_listen():
 def quit(exit = True):
     "Quit running instances of Px for loaded configuration"
     listen = get_listen()
-    port = STATE.config.getint("proxy", "port")
+    port = STATE.port
 
     if len(listen) == 0:
         pprint("Failed: Px not listening on localhost - cannot quit")
@@ -243,6 +275,10 @@ def quit(exit = True):
             elif resp == 403:
                 pprint(" Failed: cannot quit Px on remote host")
                 break
+            elif resp == 0 and success:
+                # Disconnected without response - connection was queued on a
+                # worker that just quit, retry with remaining workers
+                continue
             else:
                 pprint(f" Failed: response {resp}\n{ec.get_data()}")
                 break
@@ -322,13 +358,24 @@ class State:
     listen = None
     noproxy = ""
     pac = ""
+    port = 3128
     proxyreload = 60
     socktimeout = 20.0
     useragent = ""
 
+    # Settings
+    foreground = 0
+    threads = 32
+    workers = 2
+
+    # noproxy hosts of wproxy in CURLOPT_NOPROXY format
+    curl_noproxy = None
+
     # Auth
     auth = "ANY"
     username = ""
+    password = None
+    password_time = 0
 
     client_auth = []
     client_username = ""
@@ -336,8 +383,11 @@ class State:
 
     # Objects
     allow = netaddr.IPGlob("*.*.*.*")
+    allow_ranges = ([0], [0xFFFFFFFF])
     config = None
+    curl_pool = None
     debug = None
+    flags = {}
     location = LOG_NONE
     mcurl = None
     stdout = None
@@ -365,6 +415,7 @@ class State:
         # Callback functions for initialization
         self.callbacks = {
             "pac": self.set_pac,
+            "port": self.set_port,
             "listen": self.set_listen,
             "gateway": self.set_gateway,
             "hostonly": self.set_hostonly,
@@ -376,6 +427,9 @@ class State:
             "client_username": self.set_client_username,
             "client_auth": self.set_client_auth,
             "client_nosspi": self.set_client_nosspi,
+            "workers": self.set_workers,
+            "threads": self.set_threads,
+            "foreground": self.set_foreground,
             "log": self.set_debug,
             "idle": self.set_idle,
             "socktimeout": self.set_socktimeout,
@@ -396,7 +450,7 @@ class State:
         elif pac.startswith("file"):
             # file://
             pac = file_url_to_local_path(pac)
-            if os.path.exists(pac):
+            if pac is not None and os.path.exists(pac):
                 pacproxy = True
 
         else:
@@ -413,6 +467,9 @@ class State:
             pprint("Unsupported PAC location or file not found: %s" % pac)
             sys.exit(ERROR_CONFIG)
 
+    def set_port(self, port):
+        self.port = port
+
     def set_listen(self, listen):
         if len(listen) == 0:
             # Listen on localhost only if blank
@@ -433,6 +490,7 @@ class State:
 
     def set_allow(self, allow):
         self.allow, _ = wproxy.parse_noproxy(allow, iponly = True)
+        self.allow_ranges = wproxy.ipset_to_ranges(self.allow)
 
     def set_noproxy(self, noproxy):
         self.noproxy = noproxy
@@ -463,6 +521,29 @@ class State:
 
         sys.exit(ERROR_SUCCESS)
 
+    def get_password(self):
+        """
+        Get password for username from PX_PASSWORD or keyring
+
+        Cached for PASSWORD_TTL seconds so that keyring changes are picked up without
+        a restart - failed lookups are not cached so they are retried on next use
+        """
+        if self.password is None or time.time() - self.password_time > PASSWORD_TTL:
+            if "PX_PASSWORD" in os.environ:
+                # Use environment variable PX_PASSWORD
+                self.password = os.environ["PX_PASSWORD"]
+            else:
+                # Use keyring to get password
+                try:
+                    self.password = keyring.get_password(REALM, self.username)
+                except keyring.errors.KeyringError as exc:
+                    # No keyring backend available - headless Linux, containers
+                    dprint("Failed to get password from keyring: %s", exc)
+                    self.password = None
+            self.password_time = time.time()
+
+        return self.password
+
     def set_auth(self, auth):
         if len(auth) == 0:
             auth = "ANY"
@@ -523,7 +604,7 @@ class State:
 
     def set_debug(self, location = LOG_SCRIPTDIR):
         if self.debug is None:
-            logfile = get_logfile(location)
+            logfile = get_logfile(location, self.flags)
 
             if logfile is not None:
                 self.location = location
@@ -534,6 +615,15 @@ class State:
                     # Log to <path>/debug-<name>.log
                     self.debug = Debug(logfile, "w")
 
+    def set_workers(self, workers):
+        self.workers = workers
+
+    def set_threads(self, threads):
+        self.threads = threads
+
+    def set_foreground(self, foreground):
+        self.foreground = foreground
+
     def set_idle(self, idle):
         self.idle = idle
 
@@ -547,6 +637,14 @@ class State:
     def set_test(self, test):
         self.test = test
 
+    def set_wproxy(self, wp):
+        "Set proxy info and save noproxy hosts for libcurl since used for every request"
+        # libcurl handles noproxy domains only. IP addresses are still handled within wproxy
+        # since libcurl only supports CIDR addresses since v7.86 and does not support wildcards
+        # (192.168.0.*) or ranges (192.168.0.1-192.168.0.255)
+        self.curl_noproxy = ",".join(wp.noproxy_hosts) or None
+        self.wproxy = wp
+
     # Configuration setup
 
     def cfg_int_init(self, section, name, default, proc=None, override=False):
@@ -680,27 +778,31 @@ class State:
 
     def parse_config(self):
         "Parse configuration from CLI flags, environment and config file in order"
-        if "--debug" in sys.argv:
+
+        # Load CLI flags
+        self.flags = flags = self.parse_cli()
+
+        if "debug" in flags:
             self.set_debug(LOG_SCRIPTDIR)
-        elif "--uniqlog" in sys.argv:
+        elif "uniqlog" in flags:
             self.set_debug(LOG_UNIQLOG)
-        elif "--verbose" in sys.argv:
+        elif "verbose" in flags:
             self.set_debug(LOG_STDOUT)
 
-            if "--foreground" not in sys.argv:
-                # --verbose implies --foreground
+            if flags.get("foreground") != "1":
+                # --verbose implies --foreground - also in sys.argv for child processes
+                flags["foreground"] = "1"
                 sys.argv.append("--foreground")
 
         if sys.platform == "win32":
             if is_compiled() or "pythonw.exe" in sys.executable:
                 windows.attach_console(self)
 
-        if "-h" in sys.argv or "--help" in sys.argv:
+        if "-h" in sys.argv or "help" in flags:
             pprint(HELP)
             sys.exit(ERROR_SUCCESS)
 
-        # Load CLI flags and environment variables
-        flags = self.parse_cli()
+        # Load environment variables
         env = self.parse_env()
 
         # Check if config file specified in CLI flags or environment
@@ -801,23 +903,25 @@ class State:
         # Handle actions
 
         if sys.platform == "win32":
-            if "--install" in sys.argv:
+            if "install" in flags:
                 windows.install(get_script_cmd())
-            elif "--uninstall" in sys.argv:
+            elif "uninstall" in flags:
                 windows.uninstall()
 
-        if "--quit" in sys.argv:
+        if "quit" in flags:
             quit()
-        elif "--restart" in sys.argv:
+        elif "restart" in flags:
             ret = quit(exit = False)
             if ret != 0:
                 sys.exit(ret)
+            # Child processes parse sys.argv again
+            del flags["restart"]
             sys.argv.remove("--restart")
-        elif "--save" in sys.argv:
+        elif "save" in flags:
             self.save()
-        elif "--password" in sys.argv:
+        elif "password" in flags:
             self.set_password()
-        elif "--client-password" in sys.argv:
+        elif "client_password" in flags:
             self.set_client_password()
 
         ###
@@ -825,34 +929,43 @@ class State:
 
         servers = wproxy.parse_proxy(self.config.get("proxy", "server"))
         if len(servers) != 0:
-            self.wproxy = wproxy.Wproxy(wproxy.MODE_CONFIG, servers, noproxy = self.noproxy, debug_print = dprint)
+            self.set_wproxy(wproxy.Wproxy(wproxy.MODE_CONFIG, servers, noproxy = self.noproxy, debug_print = dprint))
         elif len(self.pac) != 0:
             pac_encoding = self.config.get("proxy", "pac_encoding")
-            self.wproxy = wproxy.Wproxy(wproxy.MODE_CONFIG_PAC, [self.pac], noproxy = self.noproxy, pac_encoding = pac_encoding, debug_print = dprint)
+            self.set_wproxy(wproxy.Wproxy(wproxy.MODE_CONFIG_PAC, [self.pac], noproxy = self.noproxy, pac_encoding = pac_encoding, debug_print = dprint))
         else:
-            self.wproxy = wproxy.Wproxy(noproxy = self.noproxy, debug_print = dprint)
+            self.set_wproxy(wproxy.Wproxy(noproxy = self.noproxy, debug_print = dprint))
             self.proxy_last_reload = time.time()
 
         # Curl multi object to manage all easy connections
         self.mcurl = mcurl.MCurl(debug_print = dprint)
 
+        # Curl easy objects reused across client connections - one per thread
+        self.curl_pool = queue.LifoQueue(self.threads)
+
     def reload_proxy(self):
         # Return if proxies specified in Px config
         if self.wproxy.mode in [wproxy.MODE_CONFIG, wproxy.MODE_CONFIG_PAC]:
             return
 
+        # Check if need to refresh without locking since called for every request
+        if (self.proxy_last_reload is not None and
+                time.time() - self.proxy_last_reload < self.proxyreload):
+            return
+
         # Do locking to avoid updating globally shared State object by multiple
         # threads simultaneously
         self.state_lock.acquire()
         try:
-            # Check if need to refresh
+            # Check again in case another thread refreshed while waiting for lock
             if (self.proxy_last_reload is not None and
                     time.time() - self.proxy_last_reload < self.proxyreload):
                 dprint("Skip proxy refresh")
                 return
 
-            # Reload proxy information
-            self.wproxy = wproxy.Wproxy(noproxy = self.noproxy, debug_print = dprint)
+            # Reload proxy information - requests in other threads continue
+            # to use the previous Wproxy until it is replaced
+            self.set_wproxy(wproxy.Wproxy(noproxy = self.noproxy, debug_print = dprint))
 
             self.proxy_last_reload = time.time()
 
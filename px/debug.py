@@ -1,7 +1,6 @@
 "Direct stdout and stderr to a file for debugging"
 
 import multiprocessing
-import os
 import sys
 import threading
 import time
@@ -72,13 +71,16 @@ class Debug:
     def flush(self):
         "Flush data to debug file and stdout after write"
         if self.file is not None:
+            # Flushing to the OS is enough to keep output if Px exits abruptly
+            # via os._exit() - fsync() per line made debug logging disk bound
             self.file.flush()
-            os.fsync(self.file.fileno())
         if self.stdout is not None:
             self.stdout.flush()
 
-    def print(self, msg):
-        "Print message to stdout and debug file if open"
+    def print(self, msg, *args):
+        "Print message formatted with args to stdout and debug file if open"
+        if args:
+            msg = msg % args
         offset = 0
         tree = ""
         while True:
@@ -97,10 +99,14 @@ class Debug:
             ": " + tree + ": " + msg + "\n")
 
     def get_print(self):
-        "Get self.print() method to call directly as print(msg)"
+        "Get self.print() method to call directly as print(msg, *args)"
         return self.print
 
-def dprint(msg):
-    "Print debug message if debug is enabled"
+def dprint(msg, *args):
+    """
+    Print debug message if debug is enabled
+      msg is only formatted with args when printed so call sites should pass
+      args instead of formatting themselves
+    """
     if Debug.instance is not None:
-        Debug.instance.print(msg)
+        Debug.instance.print(msg, *args)
@@ -5,6 +5,7 @@ import hashlib
 import html
 import http.server
 import os
+import queue
 import socket
 import sys
 import time
@@ -91,15 +92,10 @@ def set_curl_auth(curl, auth):
         pwd = None
         if len(STATE.username) != 0:
             key = STATE.username
-            if "PX_PASSWORD" in os.environ:
-                # Use environment variable PX_PASSWORD
-                pwd = os.environ["PX_PASSWORD"]
-            else:
-                # Use keyring to get password
-                pwd = keyring.get_password("Px", key)
+            pwd = STATE.get_password()
         if len(key) == 0:
             if sys.platform == "win32":
-                dprint(curl.easyhash + ": Using SSPI to login")
+                dprint("%s: Using SSPI to login", curl.easyhash)
                 key = ":"
             else:
                 dprint("SSPI not available and no username configured - no auth")
@@ -107,9 +103,36 @@ def set_curl_auth(curl, auth):
         curl.set_auth(user = key, password = pwd, auth = auth)
     else:
         # Explicitly deferring proxy authentication to the client
-        dprint(curl.easyhash + ": Skipping proxy authentication")
+        dprint("%s: Skipping proxy authentication", curl.easyhash)
         curl.is_easy = True
 
+def get_curl(url, method, request_version, connect_timeout):
+    "Get a Curl instance from the pool if available, else create a new one"
+    try:
+        curl = STATE.curl_pool.get_nowait()
+    except queue.Empty:
+        return mcurl.Curl(url, method, request_version, connect_timeout)
+
+    curl.reset(url, method, request_version, connect_timeout)
+    return curl
+
+def release_curl(curl):
+    "Return Curl instance to the pool for use by other connections"
+    STATE.mcurl.remove(curl)
+    if curl.is_connect:
+        # Tunnel socket is owned by this easy handle - let it close on cleanup
+        return
+
+    if STATE.auth == "NONE":
+        # Client authenticates directly with upstream proxy on the easy handle's
+        # own connections - never hand those to another client
+        return
+
+    try:
+        STATE.curl_pool.put_nowait(curl)
+    except queue.Full:
+        pass
+
 ###
 # Proxy handler
 
@@ -133,17 +156,23 @@ class PxHandler(http.server.BaseHTTPRequestHandler):
                 easyhash = self.curl.easyhash + ": "
                 STATE.mcurl.stop(self.curl)
                 self.curl = None
-            dprint(easyhash + str(error))
+            dprint("%s%s", easyhash, error)
         except ConnectionError:
             pass
 
+    def finish(self):
+        if self.curl is not None:
+            release_curl(self.curl)
+            self.curl = None
+        http.server.BaseHTTPRequestHandler.finish(self)
+
     def address_string(self):
         host, port = self.client_address[:2]
         #return socket.getfqdn(host)
         return host
 
     def log_message(self, format, *args):
-        dprint(format % args)
+        dprint(format, *args)
 
     def do_curl(self):
         "Handle incoming request using libcurl"
@@ -151,21 +180,16 @@ class PxHandler(http.server.BaseHTTPRequestHandler):
             return
 
         if self.curl is None:
-            self.curl = mcurl.Curl(self.path, self.command, self.request_version, STATE.socktimeout)
+            self.curl = get_curl(self.path, self.command, self.request_version, STATE.socktimeout)
         else:
             self.curl.reset(self.path, self.command, self.request_version, STATE.socktimeout)
 
-        dprint(self.curl.easyhash + ": Path = " + self.path)
+        dprint("%s: Path = %s", self.curl.easyhash, self.path)
         ipport = self.get_destination()
         if ipport is None:
-            dprint(self.curl.easyhash + ": Configuring proxy settings")
-            server = self.proxy_servers[0][0]
-            port = self.proxy_servers[0][1]
-            # libcurl handles noproxy domains only. IP addresses are still handled within wproxy
-            # since libcurl only supports CIDR addresses since v7.86 and does not support wildcards
-            # (192.168.0.*) or ranges (192.168.0.1-192.168.0.255)
-            noproxy_hosts = ",".join(STATE.wproxy.noproxy_hosts) or None
-            ret = self.curl.set_proxy(proxy = server, port = port, noproxy = noproxy_hosts)
+            dprint("%s: Configuring proxy settings", self.curl.easyhash)
+            server, port = self.proxy_servers[0]
+            ret = self.curl.set_proxy(proxy = server, port = port, noproxy = STATE.curl_noproxy)
             if not ret:
                 # Proxy server has had auth issues so returning failure to client
                 self.send_error(401, f"Proxy server authentication failed: {server}:{port}")
@@ -175,7 +199,7 @@ class PxHandler(http.server.BaseHTTPRequestHandler):
             set_curl_auth(self.curl, STATE.auth)
         else:
             # Directly connecting to the destination
-            dprint(self.curl.easyhash + ": Skipping auth proxying")
+            dprint("%s: Skipping auth proxying", self.curl.easyhash)
 
         # Set debug mode
         self.curl.set_debug(STATE.debug is not None)
@@ -194,12 +218,12 @@ class PxHandler(http.server.BaseHTTPRequestHandler):
         self.curl.set_useragent(STATE.useragent)
 
         if not STATE.mcurl.do(self.curl):
-            dprint(self.curl.easyhash + ": Connection failed: " + self.curl.errstr)
+            dprint("%s: Connection failed: %s", self.curl.easyhash, self.curl.errstr)
             self.send_error(self.curl.resp, self.curl.errstr)
         elif self.curl.is_connect:
             if self.curl.is_tunnel or not self.curl.is_proxied:
                 # Inform client that SSL connection has been established
-                dprint(self.curl.easyhash + ": SSL connected")
+                dprint("%s: SSL connected", self.curl.easyhash)
                 self.send_response(200, "Connection established")
                 self.send_header("Proxy-Agent", self.version_string())
                 self.end_headers()
@@ -229,23 +253,8 @@ class PxHandler(http.server.BaseHTTPRequestHandler):
         else:
             self.do_curl()
 
-    def do_HEAD(self):
-        self.do_curl()
-
-    def do_POST(self):
-        self.do_curl()
-
-    def do_PUT(self):
-        self.do_curl()
-
-    def do_DELETE(self):
-        self.do_curl()
-
-    def do_PATCH(self):
-        self.do_curl()
-
-    def do_CONNECT(self):
-        self.do_curl()
+    # Supported methods are dispatched directly to do_curl(), others get 501
+    do_HEAD = do_POST = do_PUT = do_DELETE = do_PATCH = do_CONNECT = do_curl
 
     def get_destination(self):
         # Reload proxy info if timeout exceeded
@@ -255,10 +264,10 @@ class PxHandler(http.server.BaseHTTPRequestHandler):
         servers, netloc, path = STATE.wproxy.find_proxy_for_url(
             ("https://" if "://" not in self.path else "") + self.path)
         if servers[0] == wproxy.DIRECT:
-            dprint(self.curl.easyhash + ": Direct connection")
+            dprint("%s: Direct connection", self.curl.easyhash)
             return netloc
         else:
-            dprint(self.curl.easyhash + ": Proxy = " + str(servers))
+            dprint("%s: Proxy = %s", self.curl.easyhash, servers)
             self.proxy_servers = servers
             return None
 
@@ -381,18 +390,18 @@ class PxHandler(http.server.BaseHTTPRequestHandler):
                 spnego.exceptions.SpnegoError,
                 ValueError) as exc:
             # Invalid token = bad login or auth issues
-            dprint("Authentication failed: " + str(exc))
+            dprint("Authentication failed: %s", exc)
             self.send_error(401, "Authentication failed")
             return False
         if outok is not None:
             # Send challenge = client needs to send response
-            dprint(f"Sending {authtype} challenge")
+            dprint("Sending %s challenge", authtype)
             self.send_auth_headers(
                 authtype = authtype, challenge = base64.b64encode(outok).decode("utf-8"))
             return False
         else:
             # Authentication complete
-            dprint(f"Authenticated {authtype} client")
+            dprint("Authenticated %s client", authtype)
             self.client_authed = True
             del self.client_ctxt
             for key in list(self.headers.keys()):
@@ -492,11 +501,11 @@ class PxHandler(http.server.BaseHTTPRequestHandler):
                 authtype = auth_header.split(" ", 1)[0].upper()
                 if authtype not in STATE.client_auth:
                     self.send_auth_headers()
-                    dprint("Unsupported client auth type: " + authtype)
+                    dprint("Unsupported client auth type: %s", authtype)
                     return False
 
                 # Authenticate client using the specified authentication type
-                dprint("Auth type: " + authtype)
+                dprint("Auth type: %s", authtype)
                 if authtype in ["NEGOTIATE", "NTLM"]:
                     if not self.do_spnego_auth(auth_header, authtype):
                         return False
@@ -1,5 +1,6 @@
 "Px is an HTTP proxy server to automatically authenticate through an NTLM proxy"
 
+import atexit
 import concurrent.futures
 import multiprocessing
 import os
@@ -19,12 +20,21 @@ from .version import __version__
 from . import config
 from . import handler
 from . import mcurl
+from . import wproxy
 
 if sys.platform == "win32":
     from . import windows
 
 warnings.filterwarnings("ignore")
 
+# Linux load balances connections across sockets bound to the same port with
+# SO_REUSEPORT so every process can listen on its own socket
+REUSE_PORT = sys.platform == "linux" and hasattr(socket, "SO_REUSEPORT")
+
+# Traceback log opened by handle_exceptions() on first exception
+EXCEPTION_LOG = None
+EXCEPTION_LOG_LOCK = threading.Lock()
+
 ###
 # Multi-processing and multi-threading
 
@@ -35,41 +45,63 @@ class PoolMixIn(socketserver.ThreadingMixIn):
         self.pool.submit(self.process_request_thread, request, client_address)
 
     def verify_request(self, request, client_address):
-        dprint("Client address: %s" % client_address[0])
-        if client_address[0] in STATE.allow:
+        dprint("Client address: %s", client_address[0])
+        if wproxy.ip_in_ranges(client_address[0], STATE.allow_ranges):
             return True
 
         if STATE.hostonly and client_address[0] in config.get_host_ips():
             dprint("Host-only IP allowed")
             return True
 
-        dprint("Client not allowed: %s" % client_address[0])
+        dprint("Client not allowed: %s", client_address[0])
         return False
 
 class ThreadedTCPServer(PoolMixIn, socketserver.TCPServer):
     daemon_threads = True
     allow_reuse_address = True
 
+    # Default backlog of 5 drops connections when clients open many at once -
+    # accept() is cheap since requests are handed off to the thread pool
+    request_queue_size = socket.SOMAXCONN
+
+    # Set SO_REUSEPORT on socket before binding
+    allow_reuse_port = False
+
     def __init__(self, server_address, RequestHandlerClass,
-            bind_and_activate=True):
+            bind_and_activate=True, reuse_port=False):
+        self.allow_reuse_port = reuse_port
         socketserver.TCPServer.__init__(self, server_address,
             RequestHandlerClass, bind_and_activate)
 
         try:
             # Workaround bad thread naming code in Python 3.6+, fixed in master
             self.pool = concurrent.futures.ThreadPoolExecutor(
-                max_workers=STATE.config.getint("settings", "threads"),
+                max_workers=STATE.threads,
                 thread_name_prefix="Thread")
         except:
             self.pool = concurrent.futures.ThreadPoolExecutor(
-                max_workers=STATE.config.getint("settings", "threads"))
+                max_workers=STATE.threads)
+
+    def server_bind(self):
+        if self.allow_reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        socketserver.TCPServer.server_bind(self)
+
+def check_port(listen, port):
+    """
+    Raise OSError if port is already in use - SO_REUSEPORT would otherwise
+    allow binding to a port another Px instance is listening on
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((listen, port))
 
 def print_banner(listen, port):
     pprint(f"Serving at {listen}:{port} proc {multiprocessing.current_process().name}")
 
     if sys.platform == "win32":
         if config.is_compiled() or "pythonw.exe" in sys.executable:
-            if STATE.config.getint("settings", "foreground") == 0:
+            if STATE.foreground == 0:
                 windows.detach_console(STATE)
 
     for section in STATE.config.sections():
@@ -96,17 +128,21 @@ def start_worker(pipeout):
 
     STATE.parse_config()
 
-    port = STATE.config.getint("proxy", "port")
+    port = STATE.port
     httpds = []
     for listen in STATE.listen:
-        # Get socket from parent process for each listen address
-        mainsock = pipeout.recv()
-        if hasattr(socket, "fromshare"):
-            mainsock = socket.fromshare(mainsock)
+        if pipeout is None:
+            # Bind own socket to same port as parent process
+            httpd = ThreadedTCPServer((listen, port), handler.PxHandler, reuse_port=True)
+        else:
+            # Get socket from parent process for each listen address
+            mainsock = pipeout.recv()
+            if hasattr(socket, "fromshare"):
+                mainsock = socket.fromshare(mainsock)
 
-        # Start server but use socket from parent process
-        httpd = ThreadedTCPServer((listen, port), handler.PxHandler, bind_and_activate=False)
-        httpd.socket = mainsock
+            # Start server but use socket from parent process
+            httpd = ThreadedTCPServer((listen, port), handler.PxHandler, bind_and_activate=False)
+            httpd.socket = mainsock
 
         httpds.append(httpd)
 
@@ -118,13 +154,15 @@ def run_pool():
     # CTRL-C should exit the process
     signal.signal(signal.SIGINT, signal.SIG_DFL)
 
-    port = STATE.config.getint("proxy", "port")
+    port = STATE.port
     httpds = []
     mainsocks = []
     for listen in STATE.listen:
         # Setup server for each listen address
         try:
-            httpd = ThreadedTCPServer((listen, port), handler.PxHandler)
+            if REUSE_PORT:
+                check_port(listen, port)
+            httpd = ThreadedTCPServer((listen, port), handler.PxHandler, reuse_port=REUSE_PORT)
         except OSError as exc:
             if "attempt was made" in str(exc):
                 pprint("Px failed to start - port in use")
@@ -140,19 +178,24 @@ def run_pool():
     if sys.platform != "darwin":
         # Multiprocessing enabled on Windows and Linux, no idea how shared sockets
         # work on MacOSX
-        if sys.platform == "linux" or hasattr(socket, "fromshare"):
+        workers = STATE.workers
+        if REUSE_PORT:
+            # Linux - each worker binds its own socket with SO_REUSEPORT so the
+            # kernel can spread connections across workers
+            for _ in range(workers-1):
+                p = multiprocessing.Process(target=start_worker, args=(None,))
+                p.daemon = True
+                p.start()
+        elif sys.platform == "linux" or hasattr(socket, "fromshare"):
             # Windows needs Python > 3.3 which added socket.fromshare()- have to
             # explicitly share socket with child processes
             #
             # Linux shares all open FD with children since it uses fork()
-            workers = STATE.config.getint("settings", "workers")
             for _ in range(workers-1):
                 (pipeout, pipein) = multiprocessing.Pipe()
                 p = multiprocessing.Process(target=start_worker, args=(pipeout,))
                 p.daemon = True
                 p.start()
-                while p.pid is None:
-                    time.sleep(1)
                 for mainsock in mainsocks:
                     # Share socket for each listen address to child process
                     if hasattr(socket, "fromshare"):
@@ -170,7 +213,7 @@ def run_pool():
 def test(testurl):
     # Get Px configuration
     listen = config.get_listen()
-    port = STATE.config.getint("proxy", "port")
+    port = STATE.port
 
     if len(listen) == 0:
         pprint("Failed: Px not listening on localhost - cannot run test")
@@ -178,8 +221,9 @@ def test(testurl):
 
     # Tweak Px configuration for test - only 1 process required
     STATE.config.set("settings", "workers", "1")
+    STATE.workers = 1
 
-    if "--test-auth" in sys.argv:
+    if "test_auth" in STATE.flags:
         # Set Px to --auth=NONE
         auth = STATE.auth
         STATE.auth = "NONE"
@@ -271,20 +315,29 @@ def test(testurl):
 # Exit related
 
 def handle_exceptions(extype, value, tb):
-    # Create traceback log
-    lst = (traceback.format_tb(tb, None) +
-        traceback.format_exception_only(extype, value))
-    tracelog = '\nTraceback (most recent call last):\n' + "%-20s%s\n" % (
-        "".join(lst[:-1]), lst[-1])
+    global EXCEPTION_LOG
+
+    # Create traceback log - includes chained exceptions
+    tracelog = "\n" + "".join(traceback.TracebackException(extype, value, tb).format()) + "\n"
 
     if STATE.debug is not None:
         pprint(tracelog)
     else:
-        sys.stderr.write(tracelog)
-
-        # Save to debug.log in working directory
-        with open(config.get_logfile(config.LOG_CWD), 'w') as dbg:
-            dbg.write(tracelog)
+        # Write traceback in one call instead of line by line
+        buf = tracelog.encode("utf-8", "replace")
+        try:
+            os.write(sys.stderr.fileno(), buf)
+        except (AttributeError, OSError, ValueError):
+            # No stderr - pythonw or detached console
+            pass
+
+        # Append to debug.log in working directory - kept open so that later
+        # tracebacks don't need to reopen or overwrite it
+        with EXCEPTION_LOG_LOCK:
+            if EXCEPTION_LOG is None:
+                EXCEPTION_LOG = open(config.get_logfile(config.LOG_CWD, STATE.flags), 'ab', buffering=0)
+                atexit.register(EXCEPTION_LOG.close)
+            EXCEPTION_LOG.write(buf)
 
 ###
 # Startup
@@ -5,6 +5,7 @@ import hashlib
 import io
 import os.path
 import select
+import selectors
 import socket
 import sys
 import threading
@@ -21,9 +22,13 @@ except OSError as exc:
     sys.exit(1)
 
 # Debug shortcut
-dprint = lambda x: None
+dprint = lambda *args: None
 MCURL = None
 
+# Bridge tunnel data within the kernel using splice() - Linux only
+SPLICE = hasattr(os, "splice")
+SPLICE_SIZE = 65536
+
 # Merging ideas from:
 #   https://github.com/pycurl/pycurl/blob/master/examples/multi-socket_action-select.py
 #   https://github.com/fsbs/aiocurl
@@ -94,7 +99,7 @@ def save_auth(curl, msg):
         # Cache auth mechanism from proxy headers
         proxytype = msg.split(" ")[1].upper()
         MCURL.proxytype[curl.proxy] = proxytype
-        dprint(f"{curl.easyhash}: Caching proxy auth mechanism for {curl.proxy} as {proxytype}")
+        dprint("%s: Caching proxy auth mechanism for %s as %s", curl.easyhash, curl.proxy, proxytype)
 
         # Cached
         return True
@@ -120,9 +125,9 @@ def save_upstream(curl, msg):
         if curl.upstream == "127.0.0.1" and curl.proxy == "localhost":
             # Older libcurl workaround
             curl.upstream = curl.proxy
-        dprint(curl.easyhash + ": Upstream server = " + curl.upstream)
+        dprint("%s: Upstream server = %s", curl.easyhash, curl.upstream)
         if curl.proxy is not None and curl.upstream == curl.proxy:
-            dprint(curl.easyhash + ": Upstream server is proxy")
+            dprint("%s: Upstream server is proxy", curl.easyhash)
             curl.is_proxied = True
         return True
 
@@ -209,15 +214,15 @@ def _read_callback(buffer, size, nitems, userdata):
                 data = curl.client_rfile.read(tsize)
                 ctypes.memmove(buffer, data, tsize)
             except ConnectionError as exc:
-                dprint(curl.easyhash + ": Error reading from client: " + str(exc))
+                dprint("%s: Error reading from client: %s", curl.easyhash, exc)
                 tsize = 0
         else:
-            dprint(curl.easyhash + ": Read expected but no client")
+            dprint("%s: Read expected but no client", curl.easyhash)
             tsize = 0
     else:
         tsize = 0
 
-    dprint(curl.easyhash + ": Read %d bytes" % tsize)
+    dprint("%s: Read %d bytes", curl.easyhash, tsize)
     return tsize
 
 @libcurl.write_callback
@@ -230,13 +235,13 @@ def _write_callback(buffer, size, nitems, userdata):
                 try:
                     tsize = curl.client_wfile.write(bytes(buffer[:tsize]))
                 except ConnectionError as exc:
-                    dprint(curl.easyhash + ": Error writing to client: " + str(exc))
+                    dprint("%s: Error writing to client: %s", curl.easyhash, exc)
                     return 0
             else:
-                dprint(curl.easyhash + ": Ignored %d bytes" % tsize)
+                dprint("%s: Ignored %d bytes", curl.easyhash, tsize)
                 return tsize
         else:
-            dprint(curl.easyhash + ": Skipped %d bytes" % tsize)
+            dprint("%s: Skipped %d bytes", curl.easyhash, tsize)
             return tsize
 
     #dprint(curl.easyhash + ": Wrote %d bytes" % tsize)
@@ -251,29 +256,29 @@ def _header_callback(buffer, size, nitems, userdata):
         if curl.suppress:
             if data == b"\r\n":
                 # Stop suppressing headers since done
-                dprint(curl.easyhash + ": Resuming headers")
+                dprint("%s: Resuming headers", curl.easyhash)
                 curl.suppress = False
             return tsize
         else:
             if data == b"\r\n":
                 # Done sending headers
-                dprint(curl.easyhash + ": Done sending headers")
+                dprint("%s: Done sending headers", curl.easyhash)
                 curl.sentheaders = True
             elif curl.auth is not None and data[0] == 72 and b"407" in data:
                 # Header starts with H and has 407 - HTTP/x.x 407 (issue #148)
                 # Px is configured to authenticate so don't send auth related
                 # headers from upstream proxy to client
-                dprint(curl.easyhash + ": Suppressing headers")
+                dprint("%s: Suppressing headers", curl.easyhash)
                 curl.suppress = True
                 return tsize
         if curl.client_hfile is not None:
             try:
                 return curl.client_hfile.write(data)
             except ConnectionError as exc:
-                dprint(curl.easyhash + ": Error writing header to client: " + str(exc))
+                dprint("%s: Error writing header to client: %s", curl.easyhash, exc)
                 return 0
         else:
-            dprint(curl.easyhash + ": Ignored %d bytes" % tsize)
+            dprint("%s: Ignored %d bytes", curl.easyhash, tsize)
             return tsize
 
     return 0
@@ -329,7 +334,7 @@ class Curl:
         """
         self.easy = libcurl.easy_init()
         self.easyhash = gethash(self.easy)
-        dprint(self.easyhash + ": New curl instance")
+        dprint("%s: New curl instance", self.easyhash)
 
         self._setup(url, method, request_version, connect_timeout)
 
@@ -342,7 +347,7 @@ class Curl:
 
     def _setup(self, url, method, request_version, connect_timeout):
         "Setup curl instance based on request info"
-        dprint(self.easyhash + ": %s %s using %s" % (method, url, request_version))
+        dprint("%s: %s %s using %s", self.easyhash, method, url, request_version)
 
         # Ignore proxy environment variables
         libcurl.easy_setopt(self.easy, libcurl.CURLOPT_PROXY, b"")
@@ -371,7 +376,7 @@ class Curl:
                 # libcurl < v7.45 does not support CURLINFO_ACTIVESOCKET so it is not possible
                 # to reuse existing connections
                 libcurl.easy_setopt(self.easy, libcurl.CURLOPT_FRESH_CONNECT, True)
-                dprint(self.easyhash + ": Fresh connection requested")
+                dprint("%s: Fresh connection requested", self.easyhash)
 
                 # Need to know socket assigned for CONNECT since used later in select()
                 # CURLINFO_ACTIVESOCKET not available on libcurl < v7.45  so need this
@@ -398,7 +403,7 @@ class Curl:
                 self.is_patch = True
             libcurl.easy_setopt(self.easy, libcurl.CURLOPT_CUSTOMREQUEST, method.encode("utf-8"))
         else:
-            dprint(self.easyhash + ": Unknown method: " + method)
+            dprint("%s: Unknown method: %s", self.easyhash, method)
             libcurl.easy_setopt(self.easy, libcurl.CURLOPT_CUSTOMREQUEST, method.encode("utf-8"))
 
         self.url = url
@@ -418,7 +423,7 @@ class Curl:
 
     def reset(self, url, method = "GET", request_version = "HTTP/1.1", connect_timeout = 60):
         "Reuse existing curl instance for another request"
-        dprint(self.easyhash + ": Resetting curl")
+        dprint("%s: Resetting curl", self.easyhash)
         libcurl.easy_reset(self.easy)
         self.sock_fd = None
 
@@ -441,6 +446,7 @@ class Curl:
         self.upstream = None
 
         self.is_connect = False
+        self.is_easy = False
         self.is_patch = False
         self.is_post = False
         self.is_proxied = False
@@ -456,7 +462,7 @@ class Curl:
 
     def set_tunnel(self, tunnel=True):
         "Set to tunnel through proxy if no proxy or proxy + auth"
-        dprint(self.easyhash + ": HTTP proxy tunneling = " + str(tunnel))
+        dprint("%s: HTTP proxy tunneling = %s", self.easyhash, tunnel)
         libcurl.easy_setopt(self.easy, libcurl.CURLOPT_HTTPPROXYTUNNEL, tunnel)
         libcurl.easy_setopt(self.easy, libcurl.CURLOPT_SUPPRESS_CONNECT_HEADERS, tunnel)
         self.is_tunnel = tunnel
@@ -466,14 +472,14 @@ class Curl:
         Set proxy options - returns False if this proxy server has auth failures
         """
         if proxy in MCURL.failed:
-            dprint(self.easyhash + ": Authentication issues with this proxy server")
+            dprint("%s: Authentication issues with this proxy server", self.easyhash)
             return False
 
         self.proxy = proxy
         libcurl.easy_setopt(self.easy, libcurl.CURLOPT_PROXY, proxy.encode("utf-8"))
         libcurl.easy_setopt(self.easy, libcurl.CURLOPT_PROXYPORT, port)
         if noproxy is not None:
-            dprint(self.easyhash + ": Set noproxy to " + noproxy)
+            dprint("%s: Set noproxy to %s", self.easyhash, noproxy)
             libcurl.easy_setopt(self.easy, libcurl.CURLOPT_NOPROXY, noproxy.encode("utf-8"))
 
         if self.is_connect:
@@ -492,16 +498,16 @@ class Curl:
             if password is not None:
                 libcurl.easy_setopt(self.easy, libcurl.CURLOPT_PROXYPASSWORD, password.encode("utf-8"))
             else:
-                dprint(self.easyhash + ": Blank password for user")
+                dprint("%s: Blank password for user", self.easyhash)
         if auth is not None:
             if self.proxy in MCURL.proxytype:
                 # Use cached value
                 self.auth = MCURL.proxytype[self.proxy]
-                dprint(f"{self.easyhash}: Using cached proxy auth mechanism {self.auth}")
+                dprint("%s: Using cached proxy auth mechanism %s", self.easyhash, self.auth)
             else:
                 # Use specified value
                 self.auth = auth
-                dprint(f"{self.easyhash}: Setting proxy auth mechanism to {self.auth}")
+                dprint("%s: Setting proxy auth mechanism to %s", self.easyhash, self.auth)
 
             authval = getauth(self.auth)
             libcurl.easy_setopt(self.easy, libcurl.CURLOPT_PROXYAUTH, authval)
@@ -511,18 +517,24 @@ class Curl:
                 self.set_tunnel()
 
     def set_headers(self, xheaders):
-        "Set headers to send"
+        """
+        Set headers to send
+
+        xheaders = dict or http.client.HTTPMessage - headers are read as (name, value)
+        pairs so repeated headers are all forwarded
+        """
         self.headers = ctypes.POINTER(libcurl.slist)()
         skip_proxy_headers = True if self.proxy is not None and self.auth is not None else False
-        for header in xheaders:
+        xheaders = list(xheaders.items())
+        for header, value in xheaders:
             lcheader = header.lower()
             if skip_proxy_headers and lcheader.startswith("proxy-"):
                 # Don't forward proxy headers from client if no upstream proxy
                 # or no auth specified (client will authenticate directly)
-                dprint(self.easyhash + ": Skipping header =!> %s: %s" % (header, xheaders[header]))
+                dprint("%s: Skipping header =!> %s: %s", self.easyhash, header, value)
                 continue
             elif lcheader == "content-length":
-                size = int(xheaders[header])
+                size = int(value)
                 if self.is_upload or self.is_post:
                     # Save content-length for PUT/POST later
                     # Turn off Transfer-Encoding since size is known
@@ -543,20 +555,20 @@ class Curl:
                     libcurl.easy_setopt(self.easy, libcurl.CURLOPT_COPYPOSTFIELDS, data)
             elif lcheader == "user-agent":
                 # Forward user agent via setopt
-                self.set_useragent(xheaders[header])
+                self.set_useragent(value)
                 continue
-            dprint(self.easyhash + ": Adding header => " + sanitized("%s: %s" % (header, xheaders[header])))
-            self.headers = libcurl.slist_append(self.headers,
-                ("%s: %s" % (header, xheaders[header])).encode("utf-8"))
+            line = f"{header}: {value}"
+            dprint("%s: Adding header => %s", self.easyhash, sanitized(line))
+            self.headers = libcurl.slist_append(self.headers, line.encode("utf-8"))
 
         if len(xheaders) != 0:
             if self.is_connect and not self.is_tunnel:
                 # Send client headers later in select() - just connect to proxy
                 # and let client tunnel and authenticate directly
-                dprint(self.easyhash + ": Delaying headers")
+                dprint("%s: Delaying headers", self.easyhash)
                 self.xheaders = xheaders
             else:
-                dprint(self.easyhash + ": Setting headers")
+                dprint("%s: Setting headers", self.easyhash)
                 libcurl.easy_setopt(self.easy, libcurl.CURLOPT_HTTPHEADER, self.headers)
 
     def set_insecure(self, enable = True):
@@ -586,7 +598,7 @@ class Curl:
         Writes data back to client_wfile
         Writes headers back to client_hfile
         """
-        dprint(self.easyhash + ": Setting up bridge")
+        dprint("%s: Setting up bridge", self.easyhash)
 
         # Setup read/write callbacks
         if client_rfile is not None:
@@ -608,7 +620,7 @@ class Curl:
 
     def buffer(self, data = None):
         "Setup buffers to bridge curl perform"
-        dprint(self.easyhash + ": Setting up buffers for bridge")
+        dprint("%s: Setting up buffers for bridge", self.easyhash)
         rfile = None
         if data is not None:
             rfile = io.BytesIO()
@@ -627,7 +639,7 @@ class Curl:
     def set_useragent(self, useragent):
         "Set user agent to send"
         if len(useragent) != 0:
-            dprint(self.easyhash + ": Setting user agent to " + useragent)
+            dprint("%s: Setting user agent to %s", self.easyhash, useragent)
             libcurl.easy_setopt(self.easy, libcurl.CURLOPT_USERAGENT, useragent.encode("utf-8"))
 
     def set_follow(self, enable = True):
@@ -642,7 +654,7 @@ class Curl:
         MCURL.handles[self.easyhash] = self
         self.cerr = libcurl.easy_perform(self.easy)
         if self.cerr != libcurl.CURLE_OK:
-            dprint(self.easyhash + ": Connection failed: " + str(self.cerr) + "; " + self.errstr)
+            dprint("%s: Connection failed: %s; %s", self.easyhash, self.cerr, self.errstr)
         MCURL.handles.pop(self.easyhash)
         return self.cerr
 
@@ -702,22 +714,31 @@ class Curl:
 def _socket_callback(easy, sock_fd, ev_bitmask, userp, socketp):
     # libcurl socket callback: add/remove actions for socket events
     del easy, userp, socketp
-    if ev_bitmask & libcurl.CURL_POLL_IN or ev_bitmask & libcurl.CURL_POLL_INOUT:
-        #dprint("Read sock_fd %d" % sock_fd)
-        if sock_fd not in MCURL.rlist:
-            MCURL.rlist.append(sock_fd)
-
-    if ev_bitmask & libcurl.CURL_POLL_OUT or ev_bitmask & libcurl.CURL_POLL_INOUT:
-        #dprint("Write sock_fd %d" % sock_fd)
-        if sock_fd not in MCURL.wlist:
-            MCURL.wlist.append(sock_fd)
+    events = 0
+    if ev_bitmask & libcurl.CURL_POLL_IN:
+        events |= selectors.EVENT_READ
+    if ev_bitmask & libcurl.CURL_POLL_OUT:
+        events |= selectors.EVENT_WRITE
 
     if ev_bitmask & libcurl.CURL_POLL_REMOVE:
+        events = 0
+
+    if MCURL._selecting:
+        # Another thread is waiting on the selector - leave the change to it
+        MCURL._pending[sock_fd] = events
+        MCURL._wake()
+    elif events == 0:
         #dprint("Remove sock_fd %d" % sock_fd)
-        if sock_fd in MCURL.rlist:
-            MCURL.rlist.remove(sock_fd)
-        if sock_fd in MCURL.wlist:
-            MCURL.wlist.remove(sock_fd)
+        try:
+            MCURL.selector.unregister(sock_fd)
+        except KeyError:
+            pass
+    else:
+        #dprint("Watch sock_fd %d for %d" % (sock_fd, events))
+        try:
+            MCURL.selector.modify(sock_fd, events)
+        except KeyError:
+            MCURL.selector.register(sock_fd, events)
 
     return libcurl.CURLE_OK
 
@@ -769,8 +790,13 @@ class MCurl:
     proxytype = None
     failed = None # Proxy servers with auth failures
     timer = None
-    rlist = None
-    wlist = None
+    selector = None
+
+    # Only one thread waits on sockets at a time, outside of _lock
+    _selecting = False
+    _selected = None
+    _wakeup = None
+    _pending = None # sock_fd => events to apply to selector once waiting is done
 
     def __init__(self, debug_print = None):
         "Initialize multi interface"
@@ -797,9 +823,16 @@ class MCurl:
         self.handles = {}
         self.proxytype = {}
         self.failed = []
-        self.rlist = []
-        self.wlist = []
+        self.selector = selectors.DefaultSelector()
         self._lock = threading.Lock()
+        self._selected = threading.Condition(self._lock)
+        self._pending = {}
+
+        # Socket pair to interrupt the waiting thread when handles are added
+        self._wakeup = socket.socketpair()
+        for sock in self._wakeup:
+            sock.setblocking(False)
+        self.selector.register(self._wakeup[0], selectors.EVENT_READ)
 
     def setopt(self, option, value):
         "Configure multi options"
@@ -844,19 +877,30 @@ class MCurl:
 
     def _add_handle(self, curl: Curl):
         # Add a handle
-        dprint(curl.easyhash + ": Add handle")
+        dprint("%s: Add handle", curl.easyhash)
         if curl.easyhash not in self.handles:
             self.handles[curl.easyhash] = curl
             libcurl.multi_add_handle(self._multi, curl.easy)
-            dprint(curl.easyhash + ": Added handle")
+            dprint("%s: Added handle", curl.easyhash)
         else:
-            dprint(curl.easyhash + ": Active handle")
+            dprint("%s: Active handle", curl.easyhash)
 
     def add(self, curl: Curl):
         "Add a Curl handle to perform"
         with self._lock:
-            dprint(curl.easyhash + ": Handles = %d" % len(self.handles))
+            dprint("%s: Handles = %d", curl.easyhash, len(self.handles))
             self._add_handle(curl)
+            if self._selecting:
+                # Waiting thread needs to pick up the new handle's timer
+                self._wake()
+
+    def _wake(self):
+        # Interrupt the thread waiting on the selector
+        try:
+            self._wakeup[1].send(b"\0")
+        except BlockingIOError:
+            # Already signalled
+            pass
 
     # Removing from multi
 
@@ -871,7 +915,7 @@ class MCurl:
         if len(errstr) != 0:
             curl.errstr += errstr + "; "
 
-        dprint(curl.easyhash + ": Remove handle: " + curl.errstr)
+        dprint("%s: Remove handle: %s", curl.easyhash, curl.errstr)
         libcurl.multi_remove_handle(self._multi, curl.easy)
 
         self.handles.pop(curl.easyhash)
@@ -888,33 +932,80 @@ class MCurl:
 
     # Executing multi
 
-    def _perform(self):
-        # Perform all tasks in the multi instance
+    def _perform(self, curl: Curl):
+        # Perform all tasks in the multi instance till curl is done
         with self._lock:
-            rlen = len(self.rlist)
-            wlen = len(self.wlist)
-            if rlen != 0 or wlen != 0:
-                rready, wready, xready = select.select(
-                    self.rlist, self.wlist, set(self.rlist) | set(self.wlist), self.timer)
-            else:
-                rready, wready, xready = [], [], []
-                if self.timer is not None:
-                    # Sleeping within lock - needs fix
-                    time.sleep(self.timer)
-
-            if len(rready) == 0 and len(wready) == 0 and len(xready) == 0:
-                #dprint("No activity")
-                self._socket_action(libcurl.CURL_SOCKET_TIMEOUT, 0)
-            else:
-                for sock_fd in rready:
-                    #dprint("Ready to read sock_fd %d" % sock_fd)
-                    self._socket_action(sock_fd, libcurl.CURL_CSELECT_IN)
-                for sock_fd in wready:
-                    #dprint("Ready to write sock_fd %d" % sock_fd)
-                    self._socket_action(sock_fd, libcurl.CURL_CSELECT_OUT)
-                for sock_fd in xready:
-                    #dprint("Error sock_fd %d" % sock_fd)
-                    self._socket_action(sock_fd, libcurl.CURL_CSELECT_ERR)
+            if curl.done:
+                # Finished by another thread since caller last checked
+                return
+
+            if self._selecting:
+                # Another thread is waiting on sockets - wait till it has
+                # acted on them so that caller can check if its handle is done
+                self._selected.wait()
+                return
+
+            self._selecting = True
+            timeout = self.timer
+
+        # Wait without lock so that other threads can add and remove handles
+        ready = []
+        try:
+            # No timer means libcurl is only waiting on sockets - still wake up
+            # once a second in case handles were removed meanwhile
+            ready = self.selector.select(timeout if timeout is not None else 1)
+        except OSError as exc:
+            # Socket closed by another thread while waiting
+            dprint("Select failed: %s", exc)
+        finally:
+            with self._lock:
+                self._selecting = False
+                try:
+                    self._act(ready)
+                finally:
+                    self._selected.notify_all()
+
+    def _act(self, ready):
+        # Act on sockets returned by selector.select() or on timeout
+        #   Called with _lock held
+        for sock_fd, events in self._pending.items():
+            # Socket changes made by libcurl while waiting - re-register
+            # since sock_fd might have been closed and reused meanwhile
+            try:
+                self.selector.unregister(sock_fd)
+            except KeyError:
+                pass
+            if events != 0:
+                self.selector.register(sock_fd, events)
+        self._pending.clear()
+
+        sock_map = self.selector.get_map()
+        actions = 0
+        for key, events in ready:
+            if key.fileobj is self._wakeup[0]:
+                # Woken up to pick up a new handle
+                try:
+                    self._wakeup[0].recv(4096)
+                except BlockingIOError:
+                    pass
+                continue
+
+            if key.fd not in sock_map:
+                # Removed by libcurl while waiting
+                continue
+
+            #dprint("Ready sock_fd %d for %d" % (key.fd, events))
+            ev_bitmask = 0
+            if events & selectors.EVENT_READ:
+                ev_bitmask |= libcurl.CURL_CSELECT_IN
+            if events & selectors.EVENT_WRITE:
+                ev_bitmask |= libcurl.CURL_CSELECT_OUT
+            self._socket_action(key.fd, ev_bitmask)
+            actions += 1
+
+        if actions == 0:
+            #dprint("No activity")
+            self._socket_action(libcurl.CURL_SOCKET_TIMEOUT, 0)
 
     def do(self, curl: Curl):
         "Add a Curl handle and peform until completion"
@@ -923,10 +1014,9 @@ class MCurl:
             while True:
                 if curl.done:
                     break
-                self._perform()
-                time.sleep(0.01)
+                self._perform(curl)
         else:
-            dprint(curl.easyhash + ": Using easy interface")
+            dprint("%s: Using easy interface", curl.easyhash)
             curl.perform()
 
         # Map some libcurl error codes to HTTP errors
@@ -978,7 +1068,7 @@ class MCurl:
                         self.failed.append(curl.proxy)
                 else:
                     # Setup client to authenticate directly with upstream proxy
-                    dprint(curl.easyhash + ": Client to authenticate with upstream proxy")
+                    dprint("%s: Client to authenticate with upstream proxy", curl.easyhash)
                     if not curl.is_connect:
                         # curl.errstr not set else connection will get closed during auth
                         curl.resp = codep
@@ -989,18 +1079,18 @@ class MCurl:
                 # This should never happen since we have set CURLOPT_FRESH_CONNECT = True
                 # for CONNECT
                 out = "Cannot reuse an SSL connection with libcurl < v7.45 - should never happen"
-                dprint(curl.easyhash + ": " + out)
+                dprint("%s: %s", curl.easyhash, out)
                 curl.errstr += out + "; "
                 curl.resp = 500
             else:
                 # Get the active socket using getinfo() for select()
-                dprint(curl.easyhash + ": Getting active socket")
+                dprint("%s: Getting active socket", curl.easyhash)
                 ret, sock_fd = curl.get_activesocket()
                 if ret == libcurl.CURLE_OK:
                     curl.sock_fd = sock_fd
                 else:
                     out = "Failed to get active socket: %d, %d" % (ret, sock_fd)
-                    dprint(curl.easyhash + ": " + out)
+                    dprint("%s: %s", curl.easyhash, out)
                     curl.errstr += out + "; "
                     curl.resp = 503
 
@@ -1010,22 +1100,26 @@ class MCurl:
         "Run select loop between client and curl"
         # TODO figure out if IPv6 or IPv4
         if curl.sock_fd is None:
-            dprint(curl.easyhash + ": Cannot select() without active socket")
+            dprint("%s: Cannot select() without active socket", curl.easyhash)
             return
 
-        dprint(curl.easyhash + ": Starting select loop")
+        dprint("%s: Starting select loop", curl.easyhash)
         curl_sock = socket.fromfd(curl.sock_fd, socket.AF_INET, socket.SOCK_STREAM)
 
         if curl.is_connect and (not curl.is_tunnel and curl.is_proxied):
             # Send original headers from client to tunnel and authenticate with
             # upstream proxy
-            dprint(curl.easyhash + ": Sending original client headers")
+            dprint("%s: Sending original client headers", curl.easyhash)
             curl_sock.sendall(f"{curl.method} {curl.url} {curl.request_version}\r\n".encode("utf-8"))
             if curl.xheaders is not None:
-                for header in curl.xheaders:
-                    curl_sock.sendall(f"{header}: {curl.xheaders[header]}\r\n".encode("utf-8"))
+                for header, value in curl.xheaders:
+                    curl_sock.sendall(f"{header}: {value}\r\n".encode("utf-8"))
             curl_sock.sendall(b"\r\n")
 
+        if SPLICE:
+            self.splice(curl, client_sock, curl_sock, idle)
+            return
+
         # sockets will be removed from these lists, when they are
         # detected as closed by remote host; wlist contains sockets
         # only when data has to be written
@@ -1041,7 +1135,7 @@ class MCurl:
         while (rlist or wlist):
             (ins, outs, exs) = select.select(rlist, wlist, rlist, idle)
             if exs:
-                dprint(curl.easyhash + ": Exception, breaking")
+                dprint("%s: Exception, breaking", curl.easyhash)
                 break
             if ins:
                 for i in ins:
@@ -1058,7 +1152,7 @@ class MCurl:
                         data = i.recv(4096)
                     except ConnectionError as exc:
                         # Fix #152 - handle connection errors gracefully
-                        dprint(curl.easyhash + ": from %s: " % source + str(exc))
+                        dprint("%s: from %s: %s", curl.easyhash, source, exc)
                         data = ""
                     datalen = len(data)
                     if datalen != 0:
@@ -1070,7 +1164,7 @@ class MCurl:
                         max_idle = time.time() + idle
                     else:
                         # No data means connection closed by remote host
-                        dprint(curl.easyhash + ": Connection closed by %s" % source)
+                        dprint("%s: Connection closed by %s", curl.easyhash, source)
                         # Because tunnel is closed on one end there is
                         # no need to read from both ends
                         del rlist[:]
@@ -1103,11 +1197,11 @@ class MCurl:
                                 wlist.remove(o)
                         cs += bsnt
                     else:
-                        dprint(curl.easyhash + ": No data sent")
+                        dprint("%s: No data sent", curl.easyhash)
                 max_idle = time.time() + idle
             if max_idle < time.time():
                 # No data in timeout seconds
-                dprint(curl.easyhash + ": Server connection timeout")
+                dprint("%s: Server connection timeout", curl.easyhash)
                 break
 
         # After serving the proxy tunnel it could not be used for samething else.
@@ -1116,7 +1210,89 @@ class MCurl:
         # either after timeout seconds without data transfer or when at least
         # one side closes the connection. Close both proxy and client
         # connection if still open.
-        dprint(curl.easyhash + ": %d bytes read, %d bytes written" % (cl, cs))
+        dprint("%s: %d bytes read, %d bytes written", curl.easyhash, cl, cs)
+
+    def splice(self, curl: Curl, client_sock, curl_sock, idle = 30):
+        """
+        Run select loop between client and curl moving data through a pipe
+        for each direction with splice() so that it is never copied into Px
+        """
+        flags = os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK
+        cfd = client_sock.fileno()
+        sfd = curl_sock.fileno()
+
+        # Source fd => [destination fd, pipe read fd, pipe write fd, bytes in pipe]
+        tunnels = {
+            cfd: [sfd, *os.pipe(), 0],
+            sfd: [cfd, *os.pipe(), 0]
+        }
+
+        cl = 0
+        cs = 0
+        closed = False
+        max_idle = time.time() + idle
+        try:
+            while True:
+                # Read from a source only after its pipe is drained into the
+                # destination, stop reading once either end closes
+                rlist = []
+                wlist = []
+                for src, (dst, _, _, pending) in tunnels.items():
+                    if pending != 0:
+                        wlist.append(dst)
+                    elif not closed:
+                        rlist.append(src)
+                if not (rlist or wlist):
+                    break
+
+                (ins, outs, _) = select.select(rlist, wlist, [], idle)
+                for src in ins:
+                    source = "client" if src == cfd else "server"
+                    tunnel = tunnels[src]
+                    try:
+                        datalen = os.splice(src, tunnel[2], SPLICE_SIZE, flags = flags)
+                    except BlockingIOError:
+                        continue
+                    except ConnectionError as exc:
+                        dprint("%s: from %s: %s", curl.easyhash, source, exc)
+                        datalen = 0
+                    if datalen != 0:
+                        cl += datalen
+                        tunnel[3] = datalen
+                        if tunnel[0] not in outs:
+                            outs.append(tunnel[0])
+                        max_idle = time.time() + idle
+                    else:
+                        # No data means connection closed by remote host
+                        dprint("%s: Connection closed by %s", curl.easyhash, source)
+                        closed = True
+
+                for dst in outs:
+                    tunnel = tunnels[sfd if dst == cfd else cfd]
+                    try:
+                        datalen = os.splice(tunnel[1], dst, tunnel[3], flags = flags)
+                    except BlockingIOError:
+                        continue
+                    except ConnectionError as exc:
+                        # Destination closed - pending data cannot be delivered
+                        dprint("%s: %s", curl.easyhash, exc)
+                        tunnel[3] = 0
+                        closed = True
+                        continue
+                    tunnel[3] -= datalen
+                    cs += datalen
+                    max_idle = time.time() + idle
+
+                if max_idle < time.time():
+                    # No data in timeout seconds
+                    dprint("%s: Server connection timeout", curl.easyhash)
+                    break
+        finally:
+            for _, rpipe, wpipe, _ in tunnels.values():
+                os.close(rpipe)
+                os.close(wpipe)
+
+        dprint("%s: %d bytes read, %d bytes written", curl.easyhash, cl, cs)
 
     # Cleanup multi
 
@@ -1126,6 +1302,9 @@ class MCurl:
         for easyhash in tuple(self.handles):
             self.stop(self.handles[easyhash])
         libcurl.multi_cleanup(self._multi)
+        self.selector.close()
+        for sock in self._wakeup:
+            sock.close()
 
         global MCURL
         MCURL = None
@@ -14,7 +14,7 @@ from .mcurl import Curl
 from .pacutils import PACUTILS
 
 # Debug shortcut
-dprint = lambda x: None
+dprint = lambda *args: None
 
 class Pac:
     "Load and run PAC files using quickjs"
@@ -83,7 +83,7 @@ class Pac:
         Return comma-separated list of proxy servers to use for this url
             DIRECT can be returned as one of the options in the response
         """
-        dprint(f"Finding proxy for {url}")
+        dprint("Finding proxy for %s", url)
         with self._lock:
             proxies = self._ctxt.eval("FindProxyForURL")(url, host)
 
@@ -94,19 +94,24 @@ def attach_console(state):
     pid = os.getpid()
     while True:
         try:
-            p = psutil.Process(pid)
+            # Read name and parent in one pass instead of once per attribute
+            info = psutil.Process(pid).as_dict(attrs = ["name", "ppid"])
         except psutil.NoSuchProcess:
             # No such parent - started without console
             pid = -1
             break
 
-        if os.path.basename(p.name()).lower() in [
+        if os.path.basename(info["name"] or "").lower() in [
                 "cmd", "cmd.exe", "powershell", "powershell.exe"]:
             # Found it
             break
 
         # Search parent
-        pid = p.ppid()
+        if info["ppid"] in [None, pid]:
+            # Reached top of process tree
+            pid = -1
+            break
+        pid = info["ppid"]
 
     # Not found, started without console
     if pid == -1:
@@ -1,7 +1,9 @@
 "Load proxy information from the operating system"
 
+import bisect
 import copy
 import socket
+import struct
 import sys
 import urllib.parse
 import urllib.request
@@ -33,7 +35,7 @@ MODES = [
 DIRECT = ("DIRECT", 80)
 
 # Debug shortcut
-dprint = lambda x: None
+dprint = lambda *args: None
 
 def parse_proxy(proxystrs):
     """
@@ -110,6 +112,35 @@ def parse_noproxy(noproxystr, iponly = False):
     dprint(str(noproxy_hosts))
     return noproxy, noproxy_hosts
 
+def ipset_to_ranges(ipset):
+    """
+    Convert IPv4 addresses in netaddr.IPSet into sorted lists of range start and
+    end integers for ip_in_ranges()
+    """
+    starts = []
+    ends = []
+    for iprange in ipset.iter_ipranges():
+        if iprange.version == 4:
+            starts.append(iprange.first)
+            ends.append(iprange.last)
+
+    return starts, ends
+
+def ip_in_ranges(ip, ranges):
+    """
+    Check if IPv4 address string is in ranges returned by ipset_to_ranges()
+      Faster than netaddr.IPSet membership since no IPAddress objects are created
+    """
+    try:
+        ipint = struct.unpack("!I", socket.inet_aton(ip))[0]
+    except OSError:
+        # Not an IPv4 address
+        return False
+
+    starts, ends = ranges
+    index = bisect.bisect_right(starts, ipint) - 1
+    return index >= 0 and ipint <= ends[index]
+
 class _WproxyBase:
     """
     Load proxy information from configuration or environment
@@ -128,6 +159,7 @@ class _WproxyBase:
     servers = None
     noproxy = None
     noproxy_hosts = None
+    noproxy_ranges = None
     pac = None
     pac_encoding = None
 
@@ -185,10 +217,23 @@ class _WproxyBase:
         if parse.query:
             path = path + "?" + parse.query
 
-        dprint("netloc = %s, path = %s" % (netloc, path))
+        dprint("netloc = %s, path = %s", netloc, path)
 
         return netloc, path
 
+    def ip_in_noproxy(self, ip):
+        "Check if IP address string is in noproxy list"
+
+        if self.noproxy_ranges is None:
+            # noproxy is complete once lookups begin - convert IPv4 ranges once
+            self.noproxy_ranges = ipset_to_ranges(self.noproxy)
+
+        if ":" in ip:
+            # IPv6 addresses are not in noproxy_ranges
+            return ip in self.noproxy
+
+        return ip_in_ranges(ip, self.noproxy_ranges)
+
     def check_noproxy_for_netloc(self, netloc):
         """
         Check if (host, port) is in noproxy list
@@ -197,7 +242,7 @@ class _WproxyBase:
           None to connect through proxy
         """
 
-        if self.noproxy.size:
+        if self.noproxy:
             addr = []
             try:
                 addr = socket.getaddrinfo(netloc[0], netloc[1])
@@ -208,7 +253,7 @@ class _WproxyBase:
                 ipport = addr[0][4]
                 # "%s => %s + %s" % (url, ipport, path)
 
-                if ipport[0] in self.noproxy:
+                if self.ip_in_noproxy(ipport[0]):
                     # Direct connection from noproxy configuration
                     return ipport
 
@@ -220,7 +265,7 @@ class _WproxyBase:
           None to connect through proxy
         """
 
-        if self.noproxy.size:
+        if self.noproxy:
             netloc, path = self.get_netloc(url)
             return self.check_noproxy_for_netloc(netloc)
 
@@ -481,7 +526,7 @@ else:
         pass
 
 if __name__ == "__main__":
-    wp = Wproxy(debug_print=print)
+    wp = Wproxy(debug_print=lambda msg, *args: print(msg % args))
     print("Servers: " + str(wp.servers))
     print("Noproxy: " + str(wp.noproxy))
     print("Noproxy hosts: " + str(wp.noproxy_hosts))
@@ -6,12 +6,14 @@ import os
 import platform
 import shlex
 import shutil
+import signal
 import socket
 import subprocess
 import sys
 import time
 import uuid
 
+import netaddr
 import psutil
 
 from px.config import get_host_ips
@@ -100,17 +102,52 @@ def writeflush(port, data):
 def killProcTree(pid, top=True):
     try:
         pxproc = psutil.Process(pid)
-        for child in pxproc.children(recursive=True):
-            try:
-                child.kill()
-            except psutil.NoSuchProcess:
-                pass
+        procs = pxproc.children(recursive=True)
         if top:
-            pxproc.kill()
+            procs.append(pxproc)
     except psutil.NoSuchProcess:
-        pass
+        return
+
+    # Signal all processes first so they exit concurrently
+    for proc in procs:
+        try:
+            proc.terminate()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
 
-def runPx(name, cmd, args, port):
+    # Kill any that did not exit in time
+    _, alive = psutil.wait_procs(procs, timeout=3)
+    for proc in alive:
+        try:
+            proc.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    psutil.wait_procs(alive, timeout=1)
+
+def killProcGroup(subp):
+    "Kill Px and its workers started by runPx()"
+    if sys.platform == "win32":
+        killProcTree(subp.pid)
+        return
+
+    # Px was started in its own process group - signal the whole group at once
+    for sig in [signal.SIGTERM, signal.SIGKILL]:
+        try:
+            os.killpg(subp.pid, sig)
+        except ProcessLookupError:
+            # Group is empty
+            return
+
+        # Wait up to 3 seconds for all processes in the group to exit
+        for _ in range(30):
+            try:
+                subp.poll()
+                os.killpg(subp.pid, 0)
+            except ProcessLookupError:
+                return
+            time.sleep(0.1)
+
+def runPx(name, cmd, args, port, group=False):
     cmd += f"{args} --port={port}"
     if "--nodebug" not in sys.argv:
         cmd += " --uniqlog"
@@ -123,8 +160,13 @@ def runPx(name, cmd, args, port):
 
     if sys.platform == "win32":
         cmd = "cmd /c start /wait /min " + cmd
-
-    subp = subprocess.Popen(cmd, shell=True, stdout=DEVNULL, stderr=DEVNULL)
+        subp = subprocess.Popen(cmd, shell=True, stdout=DEVNULL, stderr=DEVNULL)
+    else:
+        # Own process group if requested so that Px and its workers can be killed
+        # together with killProcGroup() - otherwise stay in the terminal's group
+        # so that Ctrl-C reaches it
+        subp = subprocess.Popen(cmd, shell=True, stdout=DEVNULL, stderr=DEVNULL,
+            start_new_session=group)
 
     return cmd, subp
 
@@ -180,7 +222,8 @@ def runTest(test, cmd, offset, port):
     return ret
 
 def getips():
-    return [str(ip) for ip in get_host_ips()]
+    # Sorted so that test order is stable across runs
+    return sorted(get_host_ips(), key = netaddr.IPAddress)
 
 def checkPxStart(ip, port):
     # Make sure Px starts
@@ -537,7 +580,7 @@ def auto():
 
         # Start client authenticating Px
         if len(PROXY) == 0 and "--noproxy" not in sys.argv:
-            subps.append(runPx("scriptMode", cmd, client_cmd, PORT+len(cmds)-1))
+            subps.append(runPx("scriptMode", cmd, client_cmd, PORT+len(cmds)-1, group=True))
 
     # Nuitka binary test
     _, _, dist = tools.get_paths("px.dist")
@@ -550,7 +593,7 @@ def auto():
 
         # Start client authenticating Px
         if len(PROXY) == 0 and "--noproxy" not in sys.argv:
-            subps.append(runPx("binary", cmd, client_cmd, PORT+len(cmds)-1))
+            subps.append(runPx("binary", cmd, client_cmd, PORT+len(cmds)-1, group=True))
     else:
         binfile = ""
 
@@ -575,7 +618,7 @@ def auto():
 
             # Start client authenticating Px
             if len(PROXY) == 0 and "--noproxy" not in sys.argv:
-                subps.append(runPx("pipModule", cmd, client_cmd, PORT+len(cmds)-1))
+                subps.append(runPx("pipModule", cmd, client_cmd, PORT+len(cmds)-1, group=True))
 
             # Run as Python console script
             cmd = shutil.which("px")
@@ -585,7 +628,7 @@ def auto():
 
                 # Start client authenticating Px
                 if len(PROXY) == 0 and "--noproxy" not in sys.argv:
-                    subps.append(runPx("pipBinary", cmd, client_cmd, PORT+len(cmds)-1))
+                    subps.append(runPx("pipBinary", cmd, client_cmd, PORT+len(cmds)-1, group=True))
             else:
                 print("Skipped: console script could not be found")
     else:
@@ -710,9 +753,10 @@ def auto():
         port = PORT+i
         quitPx(cmd, port)
     for _, subp in subps:
-        retcode = subp.wait(0.5)
-        if retcode is None:
-            killProcTree(subp.pid)
+        try:
+            subp.wait(0.5)
+        except subprocess.TimeoutExpired:
+            killProcGroup(subp)
 
     if "--norun" not in sys.argv and ret:
         # Sequential tests - cannot parallelize